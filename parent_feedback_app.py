@@ -15,6 +15,7 @@ No external services required.
 """
 
 from datetime import date
+from functools import lru_cache
 from textwrap import dedent
 import streamlit as st
 
@@ -24,6 +25,28 @@ st.set_page_config(page_title="Parent Feedback Builder", page_icon="📝", layou
 # Helper utilities
 # ----------------------------
 
+# Tone presets (module-level so they aren't rebuilt on every submission;
+# only the chosen opening is formatted)
+_OPENING_TEMPLATES = {
+    "Warm": "Hi there — just a quick update about {name} from today.",
+    "Neutral": "Hello, sharing a brief update about {name} from today.",
+    "Formal": "Good day. I'm writing to share an update regarding {name}.",
+}
+
+_SENTENCE_END = (".", "!", "?")
+
+# Dedented once at import so reopening the expander doesn't re-run dedent
+_STYLE_GUIDE_MD = dedent(
+    """
+    - Lead with strengths and concrete observations.
+    - Be specific about supports you provided today.
+    - Keep next steps short, student-facing, and achievable.
+    - Use objective language (what you saw/heard) rather than labels.
+    - Invite partnership and offer a clear way to follow up.
+    """
+)
+
+@lru_cache(maxsize=64)
 def pluralize(word_singular: str, count: int, word_plural: str | None = None) -> str:
     if count == 1:
         return word_singular
@@ -34,24 +57,19 @@ def safe_strip(text: str | None) -> str:
     return (text or "").strip()
 
 
-def join_if_any(parts: list[str], sep: str = " ") -> str:
-    return sep.join([p for p in parts if p])
-
-
 def sentence(text: str) -> str:
-    text = safe_strip(text)
+    """Terminate a pre-stripped clause with a period if needed."""
     if not text:
         return ""
-    return text if text.endswith(('.', '!', '?')) else text + "."
+    return text if text.endswith(_SENTENCE_END) else text + "."
 
 
 def list_as_clause(label: str, content: str) -> str:
-    content = safe_strip(content)
-    if not content:
-        return ""
-    return f"{label}: {content}."
+    """Format a pre-stripped value as a labelled clause, or "" if empty."""
+    return f"{label}: {content}." if content else ""
 
 
+@st.cache_data(max_entries=128, ttl=3600, show_spinner=False)
 def build_feedback(
     student_name: str,
     minutes_late: int,
@@ -71,44 +89,48 @@ def build_feedback(
 ) -> dict:
     """Return email-style and SMS-style parent messages.
     """
-    name = student_name.strip() if student_name else "your student"
+    # Normalize text inputs once so the clause builders below can use the
+    # stripped locals directly
+    name = safe_strip(student_name) or "your student"
+    lesson_covered = safe_strip(lesson_covered)
+    behavior = safe_strip(behavior)
+    mood = safe_strip(mood)
+    course = safe_strip(course)
+    homework = safe_strip(homework)
+    outstanding = safe_strip(outstanding)
+    strengths = safe_strip(strengths)
+    supports_today = safe_strip(supports_today)
+    next_steps = safe_strip(next_steps)
+    contact_pref = safe_strip(contact_pref)
 
-    # Tone presets
-    openings = {
-        "Warm": f"Hi there — just a quick update about {name} from today.",
-        "Neutral": f"Hello, sharing a brief update about {name} from today.",
-        "Formal": f"Good day. I'm writing to share an update regarding {name}.",
-    }
-    closings = {
-        "Warm": "Thanks for partnering with me!",
-        "Neutral": "Thank you for your attention.",
-        "Formal": "Thank you for your continued partnership.",
-    }
+    opening = _OPENING_TEMPLATES.get(tone, _OPENING_TEMPLATES["Neutral"]).format(name=name)
 
     # Attendance/arrival clause
     arrival_clause = ""
     if minutes_late is not None and minutes_late > 0:
         arrival_clause = sentence(
-            f"{name} arrived {minutes_late} {pluralize('minute', minutes_late)} late. I helped them get settled and connected to the task"
+            f"{name} arrived {minutes_late} {'minute' if minutes_late == 1 else 'minutes'} late. I helped them get settled and connected to the task"
         )
 
     # Lesson summary
-    lesson_clause = sentence(
-        join_if_any([
-            f"In {course.strip()}" if course else "In class",
-            f"we worked on {lesson_covered.strip()}" if lesson_covered else "we continued building core skills",
-        ])
-    )
+    if course and lesson_covered:
+        lesson_clause = sentence(f"In {course} we worked on {lesson_covered}")
+    elif course:
+        lesson_clause = f"In {course} we continued building core skills."
+    elif lesson_covered:
+        lesson_clause = sentence(f"In class we worked on {lesson_covered}")
+    else:
+        lesson_clause = "In class we continued building core skills."
 
     # Behavior & mood phrasing (asset-based, specific)
-    behavior = safe_strip(behavior)
-    mood = safe_strip(mood)
-    behavior_clause = sentence(
-        join_if_any([
-            f"Behavior noted: {behavior}" if behavior else "",
-            f"Mood observed: {mood}" if mood else "",
-        ], sep=" ")
-    )
+    if behavior and mood:
+        behavior_clause = sentence(f"Behavior noted: {behavior} Mood observed: {mood}")
+    elif behavior:
+        behavior_clause = sentence(f"Behavior noted: {behavior}")
+    elif mood:
+        behavior_clause = sentence(f"Mood observed: {mood}")
+    else:
+        behavior_clause = ""
 
     # Strengths, supports, next steps
     strengths_clause = list_as_clause("Strengths I noticed", strengths)
@@ -120,19 +142,16 @@ def build_feedback(
     outstanding_clause = list_as_clause("Outstanding/late work", outstanding)
 
     # Contact / partnership
-    contact_line = sentence(
-        join_if_any([
-            f"If helpful, I'm happy to connect via {contact_pref.lower()}" if contact_pref else "I'm happy to connect if you have questions",
-            "to keep momentum going",
-        ])
-    )
+    if contact_pref:
+        contact_line = f"If helpful, I'm happy to connect via {contact_pref.lower()} to keep momentum going."
+    else:
+        contact_line = "I'm happy to connect if you have questions to keep momentum going."
     if meeting_offer:
-        contact_line = join_if_any([contact_line, "I can also set a quick check-in with the student and counselor if needed."])
-        contact_line = sentence(contact_line)
+        contact_line += " I can also set a quick check-in with the student and counselor if needed."
 
     # Compose email-style message
     body_lines = [
-        openings.get(tone, openings["Neutral"]),
+        opening,
         arrival_clause,
         lesson_clause,
         behavior_clause,
@@ -142,23 +161,36 @@ def build_feedback(
         outstanding_clause,
         nextsteps_clause,
         contact_line,
-        #closings.get(tone, closings["Neutral"]),
         f"— {teacher}" if teacher else "",
     ]
 
-    email_message = "\n\n".join([l for l in body_lines if safe_strip(l)])
+    # The clause builders already return "" when empty, so a truthiness
+    # filter is enough — no need to re-strip each line
+    email_message = "\n\n".join(l for l in body_lines if l)
 
     # SMS-style concise message (<= 320 chars target)
     sms_bits = [
         f"Update on {name}:",
         f"{minutes_late} min late." if minutes_late and minutes_late > 0 else "On time.",
-        f"Lesson: {lesson_covered.strip()}" if lesson_covered else "Lesson continued.",
+        f"Lesson: {lesson_covered}" if lesson_covered else "Lesson continued.",
         f"Behavior: {behavior}" if behavior else "",
         f"Mood: {mood}" if mood else "",
-        f"HW: {homework.strip()}" if homework else "",
-        f"Due: {outstanding.strip()}" if outstanding else "",
+        f"HW: {homework}" if homework else "",
+        f"Due: {outstanding}" if outstanding else "",
     ]
-    sms_message = " ".join([b for b in sms_bits if safe_strip(b)])
+    # Collect bits only until the joined length passes the 320-char cap;
+    # anything beyond that would be sliced away, so joined work stays
+    # bounded even for very long free-text inputs
+    sms_parts: list[str] = []
+    acc_len = 0
+    for bit in sms_bits:
+        if not bit:
+            continue
+        acc_len += len(bit) + (1 if sms_parts else 0)
+        sms_parts.append(bit)
+        if acc_len > 320:
+            break
+    sms_message = " ".join(sms_parts)
     if len(sms_message) > 320:
         sms_message = sms_message[:317] + "..."
 
@@ -215,50 +247,52 @@ with st.form("feedback-form", clear_on_submit=False):
 
     submitted = st.form_submit_button("Generate Feedback")
 
-if submitted:
-    if not safe_strip(student_name) or not safe_strip(lesson_covered):
-        st.error("Please fill in at least the student's name and what the lesson covered.")
-    else:
-        messages = build_feedback(
-            student_name=student_name,
-            minutes_late=int(minutes_late),
-            lesson_covered=lesson_covered,
-            behavior=behavior,
-            mood=mood,
-            homework=homework,
-            outstanding=outstanding,
-            strengths=strengths,
-            supports_today=supports_today,
-            next_steps=next_steps,
-            tone=tone,
-            teacher=teacher,
-            course=course,
-            contact_pref=contact_pref,
-            meeting_offer=meeting_offer,
-        )
-
-        st.success("Feedback generated!")
-
-        st.subheader("📧 Email-ready message")
-        st.text_area("", value=messages["email"], height=260)
-        st.download_button("Download email text", data=messages["email"], file_name=f"{student_name.replace(' ', '_')}_email_feedback.txt")
-
-        st.subheader("💬 SMS-sized summary")
-        st.text_area("", value=messages["sms"], height=120)
-        st.download_button("Download SMS text", data=messages["sms"], file_name=f"{student_name.replace(' ', '_')}_sms_feedback.txt")
-
-        # Light guidance
-        with st.expander("Style guide: Student-centered tips"):
-            st.markdown(
-                dedent(
-                    """
-                    - Lead with strengths and concrete observations.
-                    - Be specific about supports you provided today.
-                    - Keep next steps short, student-facing, and achievable.
-                    - Use objective language (what you saw/heard) rather than labels.
-                    - Invite partnership and offer a clear way to follow up.
-                    """
-                )
+@st.fragment
+def _render_output():
+    if submitted:
+        if not safe_strip(student_name) or not safe_strip(lesson_covered):
+            st.error("Please fill in at least the student's name and what the lesson covered.")
+        else:
+            # Keep the result in session state so download-button reruns
+            # don't lose the generated messages
+            st.session_state["last_feedback"] = build_feedback(
+                student_name=student_name,
+                minutes_late=int(minutes_late),
+                lesson_covered=lesson_covered,
+                behavior=behavior,
+                mood=mood,
+                homework=homework,
+                outstanding=outstanding,
+                strengths=strengths,
+                supports_today=supports_today,
+                next_steps=next_steps,
+                tone=tone,
+                teacher=teacher,
+                course=course,
+                contact_pref=contact_pref,
+                meeting_offer=meeting_offer,
             )
-else:
-    st.info("Fill in the form above and click **Generate Feedback** to create parent/guardian messages.")
+            st.session_state["last_slug"] = student_name.replace(" ", "_") or "student"
+            st.success("Feedback generated!")
+
+    if "last_feedback" not in st.session_state:
+        st.info("Fill in the form above and click **Generate Feedback** to create parent/guardian messages.")
+        return
+
+    messages = st.session_state["last_feedback"]
+    slug = st.session_state["last_slug"]
+
+    st.subheader("📧 Email-ready message")
+    st.code(messages["email"], language=None)
+    st.download_button("Download email text", data=messages["email"], file_name=f"{slug}_email_feedback.txt")
+
+    st.subheader("💬 SMS-sized summary")
+    st.code(messages["sms"], language=None)
+    st.download_button("Download SMS text", data=messages["sms"], file_name=f"{slug}_sms_feedback.txt")
+
+    # Light guidance
+    with st.expander("Style guide: Student-centered tips"):
+        st.markdown(_STYLE_GUIDE_MD)
+
+
+_render_output()